@@ -8,22 +8,36 @@
 #
 #  You should have received a copy of the GNU Affero General Public License along with SmartBase.  If not, see <https://www.gnu.org/licenses/>.
 
-from uuid import UUID
+from __future__ import annotations
 
-from pyrf24 import RF24Network, RF24Mesh, RF24NetworkHeader
+from typing import TYPE_CHECKING
+from uuid import UUID
 
 from SmartApi import SmartApi, AssocState
 from Packet import Packet
+from PacketQueue import PacketQueue
 from Data import InfoPacket, THSensorDataPacket, PlantSensorDataPacket
 from ProbeDatabase import ProbeDatabase
 
+if TYPE_CHECKING:
+    from pyrf24 import RF24Network, RF24Mesh, RF24NetworkHeader
+
+# Packets whose handlers block on SmartApi HTTP calls
+API_PACKETS = (Packet.INFO_PACKET.value,
+               Packet.TH_SENSOR_DATA_PACKET.value,
+               Packet.BTN_CONFIRM_PACKET.value,
+               Packet.BTN_RESET_PACKET.value)
+
 
 class PacketHandlers:
-    def __init__(self, network: RF24Network, mesh: RF24Mesh, api: SmartApi, database: ProbeDatabase):
+    def __init__(self, network: RF24Network, mesh: RF24Mesh, api: SmartApi, database: ProbeDatabase,
+                 queue_size: int = 64, packets_per_loop: int = 4):
         self.network = network
         self.mesh = mesh
         self.api = api
         self.database = database
+        self.queue = PacketQueue(queue_size)
+        self.packets_per_loop = packets_per_loop
 
     def get_random_node_id(self) -> int:
         addr_list = self.mesh.addr_list
@@ -115,23 +129,35 @@ class PacketHandlers:
         while self.network.available():
             print("Packet arrived!")
             header, payload = self.network.read()
-            if header.type == Packet.NODE_ID_REQUEST_PACKET.value:
-                self.handle_node_id_request(header, payload)
-            elif header.type == Packet.INFO_REQUEST_PACKET.value:
-                self.handle_info_request(header, payload)
-            elif header.type == Packet.INFO_PACKET.value:
-                self.handle_info(header, payload)
-            elif header.type == Packet.ERROR_PACKET.value:
-                self.handle_error(header, payload)
-            elif header.type == Packet.TH_SENSOR_DATA_PACKET.value:
-                self.handle_th_sensor_data(header, payload)
-            elif header.type == Packet.PLANT_SENSOR_DATA_PACKET.value:
-                self.handle_plant_sensor_data(header, payload)
-            elif header.type == Packet.BTN_CONFIRM_PACKET.value:
-                self.handle_confirm_assoc(header, payload)
-            elif header.type == Packet.BTN_RESET_PACKET.value:
-                self.handle_reset_assoc(header, payload)
-            elif header.type == Packet.PING_PACKET.value:
-                self.handle_ping(header)
-            else:
-                self.handle_unknown(header)
+            self.queue.push(header, payload)
+        # The radio is not read while a handler waits on the API, so return after the first one to let mesh.update() run
+        for _ in range(self.packets_per_loop):
+            packet = self.queue.pop()
+            if packet is None:
+                break
+            header, payload = packet
+            self.dispatch(header, payload)
+            if header.type in API_PACKETS:
+                break
+
+    def dispatch(self, header: RF24NetworkHeader, payload: bytearray):
+        if header.type == Packet.NODE_ID_REQUEST_PACKET.value:
+            self.handle_node_id_request(header, payload)
+        elif header.type == Packet.INFO_REQUEST_PACKET.value:
+            self.handle_info_request(header, payload)
+        elif header.type == Packet.INFO_PACKET.value:
+            self.handle_info(header, payload)
+        elif header.type == Packet.ERROR_PACKET.value:
+            self.handle_error(header, payload)
+        elif header.type == Packet.TH_SENSOR_DATA_PACKET.value:
+            self.handle_th_sensor_data(header, payload)
+        elif header.type == Packet.PLANT_SENSOR_DATA_PACKET.value:
+            self.handle_plant_sensor_data(header, payload)
+        elif header.type == Packet.BTN_CONFIRM_PACKET.value:
+            self.handle_confirm_assoc(header, payload)
+        elif header.type == Packet.BTN_RESET_PACKET.value:
+            self.handle_reset_assoc(header, payload)
+        elif header.type == Packet.PING_PACKET.value:
+            self.handle_ping(header)
+        else:
+            self.handle_unknown(header)
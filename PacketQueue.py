@@ -0,0 +1,100 @@
+#  Copyright (C) 2023 Matteo Franceschini <matteof5730@gmail.com>
+#
+#  This file is part of SmartBase.
+#  SmartBase is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  SmartBase is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#  See the GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License along with SmartBase.  If not, see <https://www.gnu.org/licenses/>.
+
+from __future__ import annotations
+
+from collections import deque, OrderedDict
+from enum import Enum
+from typing import Optional, TYPE_CHECKING
+
+from Packet import Packet
+
+if TYPE_CHECKING:
+    from pyrf24 import RF24NetworkHeader
+
+
+class Priority(Enum):
+    CONTROL = 0
+    NORMAL = 1
+    TELEMETRY = 2
+
+
+def get_priority(packet_type: int) -> Priority:
+    # INFO_PACKET registers the node UUID that the button handlers rely on, so it must not fall behind them
+    if packet_type in (Packet.NODE_ID_REQUEST_PACKET.value,
+                       Packet.INFO_PACKET.value,
+                       Packet.BTN_CONFIRM_PACKET.value,
+                       Packet.BTN_RESET_PACKET.value):
+        return Priority.CONTROL
+    elif packet_type in (Packet.TH_SENSOR_DATA_PACKET.value,
+                         Packet.PLANT_SENSOR_DATA_PACKET.value):
+        return Priority.TELEMETRY
+    else:
+        return Priority.NORMAL
+
+
+class PacketQueue:
+    def __init__(self, max_size: int = 64):
+        if max_size <= 0:
+            raise ValueError(f"Queue size must be positive, got {max_size}")
+        self.max_size = max_size
+        self.control: deque[tuple[RF24NetworkHeader, bytearray]] = deque()
+        self.normal: deque[tuple[RF24NetworkHeader, bytearray]] = deque()
+        # Only the latest telemetry packet of each type is kept for every node
+        self.telemetry: OrderedDict[tuple[int, int], tuple[RF24NetworkHeader, bytearray]] = OrderedDict()
+        self.coalesced: dict[int, int] = dict()
+        self.dropped: dict[int, int] = dict()
+
+    def __len__(self) -> int:
+        return len(self.control) + len(self.normal) + len(self.telemetry)
+
+    def count(self, counter: dict[int, int], packet_type: int):
+        counter[packet_type] = counter.get(packet_type, 0) + 1
+
+    def drop(self, header: RF24NetworkHeader):
+        self.count(self.dropped, header.type)
+
+    def shed(self, priority: Priority) -> bool:
+        if len(self.telemetry) > 0:
+            header, _ = self.telemetry.popitem(last=False)[1]
+        elif priority is Priority.CONTROL and len(self.normal) > 0:
+            header, _ = self.normal.popleft()
+        else:
+            return False
+        self.drop(header)
+        return True
+
+    def push(self, header: RF24NetworkHeader, payload: bytearray) -> bool:
+        priority = get_priority(header.type)
+        if priority is Priority.TELEMETRY:
+            key = (header.from_node, header.type)
+            if key in self.telemetry:
+                self.telemetry[key] = (header, payload)
+                self.count(self.coalesced, header.type)
+                return True
+        if len(self) >= self.max_size and not self.shed(priority):
+            self.drop(header)
+            return False
+        if priority is Priority.CONTROL:
+            self.control.append((header, payload))
+        elif priority is Priority.NORMAL:
+            self.normal.append((header, payload))
+        else:
+            self.telemetry[(header.from_node, header.type)] = (header, payload)
+        return True
+
+    def pop(self) -> Optional[tuple[RF24NetworkHeader, bytearray]]:
+        if len(self.control) > 0:
+            return self.control.popleft()
+        elif len(self.normal) > 0:
+            return self.normal.popleft()
+        elif len(self.telemetry) > 0:
+            return self.telemetry.popitem(last=False)[1]
+        return None
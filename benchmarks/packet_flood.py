@@ -0,0 +1,205 @@
+#  Copyright (C) 2023 Matteo Franceschini <matteof5730@gmail.com>
+#
+#  This file is part of SmartBase.
+#  SmartBase is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  SmartBase is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#  See the GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License along with SmartBase.  If not, see <https://www.gnu.org/licenses/>.
+
+# Control packet latency under a simulated telemetry flood.
+# Runs the real PacketHandlers against a stub radio, mesh, API and database driven by a virtual clock.
+# Every API call blocks for --api-ms, and packets arriving while the handler is busy go into a
+# 3-deep radio FIFO that is only emptied by mesh.update(); packets that do not fit are lost.
+#
+# Usage: python benchmarks/packet_flood.py [--api-ms 300] [--duration 60] [--seed 1]
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+from types import SimpleNamespace
+from uuid import uuid4
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Data import THSensorDataPacket
+from Packet import Packet
+from PacketHandler import PacketHandlers
+from SmartApi import AssocState
+
+RADIO_FIFO_SIZE = 3
+LOOP_OVERHEAD = 0.001
+CONTROL_PACKETS = (Packet.NODE_ID_REQUEST_PACKET.value, Packet.BTN_CONFIRM_PACKET.value)
+TH_PAYLOAD = THSensorDataPacket(21.5, 40.0, 21.0, 90).get_struct()
+
+
+class Radio:
+    def __init__(self, events: list[tuple[float, int, int]]):
+        self.now = 0.0
+        self.events = events
+        self.next_event = 0
+        self.fifo: list[tuple[SimpleNamespace, bytes]] = []
+        self.lost: dict[int, int] = dict()
+
+    def advance(self, seconds: float):
+        self.now += seconds
+        while self.next_event < len(self.events) and self.events[self.next_event][0] <= self.now:
+            arrival, packet_type, node_id = self.events[self.next_event]
+            self.next_event += 1
+            if len(self.fifo) < RADIO_FIFO_SIZE:
+                payload = TH_PAYLOAD if packet_type == Packet.TH_SENSOR_DATA_PACKET.value else bytes()
+                self.fifo.append((SimpleNamespace(type=packet_type, from_node=node_id, arrival=arrival), payload))
+            else:
+                self.lost[packet_type] = self.lost.get(packet_type, 0) + 1
+
+    def done(self) -> bool:
+        return self.next_event >= len(self.events) and len(self.fifo) == 0
+
+
+class StubNetwork:
+    def __init__(self):
+        self.buffer: list[tuple[SimpleNamespace, bytes]] = []
+
+    def available(self) -> bool:
+        return len(self.buffer) > 0
+
+    def read(self):
+        return self.buffer.pop(0)
+
+
+class StubMesh:
+    def __init__(self, radio: Radio, network: StubNetwork):
+        self.radio = radio
+        self.network = network
+        self.addr_list = []
+
+    def update(self):
+        self.network.buffer.extend(self.radio.fifo)
+        self.radio.fifo.clear()
+
+    def get_node_id(self, address: int) -> int:
+        return address
+
+    def getNodeID(self, address: int) -> int:
+        return address
+
+    def write(self, payload, packet_type: int, node_id: int) -> bool:
+        self.radio.advance(LOOP_OVERHEAD)
+        return True
+
+
+class StubApi:
+    def __init__(self, radio: Radio, api_latency: float):
+        self.radio = radio
+        self.api_latency = api_latency
+        self.th_posted = 0
+
+    def call(self):
+        self.radio.advance(self.api_latency)
+
+    def get_assoc_state(self, device_id):
+        self.call()
+        return AssocState.PENDING
+
+    def confirm_assoc(self, device_id):
+        self.call()
+
+    def post_th_data(self, device_id, th_sensor_data):
+        self.th_posted += 1
+        self.call()
+
+
+class StubDatabase:
+    def __init__(self):
+        self.uuid = uuid4()
+
+    def get_uuid(self, node_id: int):
+        return self.uuid
+
+
+class MeasuredHandlers(PacketHandlers):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.latencies: list[float] = []
+
+    def dispatch(self, header, payload):
+        if header.type in CONTROL_PACKETS:
+            self.latencies.append(self.mesh.radio.now - header.arrival)
+        super().dispatch(header, payload)
+
+
+class FifoHandlers(MeasuredHandlers):
+    # The handler before the priority queue: everything is dispatched inline in arrival order
+    def handler(self):
+        while self.network.available():
+            header, payload = self.network.read()
+            self.dispatch(header, payload)
+
+
+def generate_events(seed: int, duration: float, telemetry_rate: float, nodes: int, control_count: int):
+    rng = random.Random(seed)
+    events = []
+    time = 0.0
+    while True:
+        time += rng.expovariate(telemetry_rate)
+        if time >= duration:
+            break
+        events.append((time, Packet.TH_SENSOR_DATA_PACKET.value, rng.randrange(1, nodes + 1)))
+    for _ in range(control_count):
+        events.append((rng.uniform(0, duration), rng.choice(CONTROL_PACKETS), rng.randrange(1, nodes + 1)))
+    events.sort()
+    return events
+
+
+def run(handlers_class, events: list[tuple[float, int, int]], api_latency: float):
+    radio = Radio(events)
+    network = StubNetwork()
+    mesh = StubMesh(radio, network)
+    handlers = handlers_class(network, mesh, StubApi(radio, api_latency), StubDatabase())
+    with contextlib.redirect_stdout(io.StringIO()):
+        while not radio.done() or network.available() or len(handlers.queue) > 0:
+            mesh.update()
+            handlers.handler()
+            radio.advance(LOOP_OVERHEAD)
+    return handlers, radio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Control packet latency under a simulated telemetry flood.")
+    parser.add_argument("--api-ms", type=float, default=300, help="blocking time of every API call")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of simulated traffic")
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--control", type=int, default=50, help="control packets sent during the run")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    api_latency = args.api_ms / 1000
+    print(f"API latency {args.api_ms:.0f} ms, {args.nodes} nodes, {args.control} control packets in {args.duration:.0f} s")
+    for telemetry_rate in (1, 2, 5, 10):
+        events = generate_events(args.seed, args.duration, telemetry_rate, args.nodes, args.control)
+        for name, handlers_class in (("fifo", FifoHandlers), ("queue", MeasuredHandlers)):
+            handlers, radio = run(handlers_class, events, api_latency)
+            latencies = sorted(handlers.latencies)
+            lost = sum(radio.lost.get(packet_type, 0) for packet_type in CONTROL_PACKETS)
+            th_sent = sum(1 for event in events if event[1] == Packet.TH_SENSOR_DATA_PACKET.value)
+            th_lost = radio.lost.get(Packet.TH_SENSOR_DATA_PACKET.value, 0)
+            th_dropped = handlers.queue.dropped.get(Packet.TH_SENSOR_DATA_PACKET.value, 0)
+            th_coalesced = handlers.queue.coalesced.get(Packet.TH_SENSOR_DATA_PACKET.value, 0)
+            if len(latencies) > 0:
+                p50 = statistics.median(latencies) * 1000
+                p95 = latencies[int(0.95 * (len(latencies) - 1))] * 1000
+                summary = f"p50 {p50:8.1f} ms  p95 {p95:8.1f} ms  max {latencies[-1] * 1000:8.1f} ms"
+            else:
+                summary = "no control packet handled"
+            print(f"TH {telemetry_rate:>2}/s {name:>5}: {summary}  control lost {lost:>3}/{args.control}")
+            print(f"{'':>15}TH posted {handlers.api.th_posted:>4}/{th_sent}  lost at radio {th_lost:>4}"
+                  f"  coalesced {th_coalesced:>4}  dropped {th_dropped:>4}")
+
+
+if __name__ == '__main__':
+    main()
@@ -27,6 +27,7 @@ import configparser
 updateFrequencyTimer = Timer()
 checkUuidTimer = Timer()
 checkAliveTimer = Timer()
+queueStatsTimer = Timer()
 timers: dict[UUID, Timer] = dict()
 
 
@@ -57,11 +58,13 @@ def main():
     updateFrequencyTimer.every(3600000, update_db, True, mesh=mesh, db=db, api=api)
     checkUuidTimer.every(60000, check_uuid, True, mesh=mesh, db=db)
     checkAliveTimer.every(3600000, check_alive, True, mesh=mesh, db=db)
+    queueStatsTimer.every(60000, report_queue_stats, True, packet_handler=packet_handler)
 
     while True:
         hardware_loop(mesh, packet_handler)
         updateFrequencyTimer.update()
         checkUuidTimer.update()
+        queueStatsTimer.update()
         for timer in timers.values():
             timer.update()
 
@@ -137,6 +140,17 @@ def check_alive(**kwargs):
                         mesh.addr_list.pop(index)
 
 
+def report_queue_stats(**kwargs):
+    packet_handler: PacketHandlers = kwargs['packet_handler']
+    queue = packet_handler.queue
+    if len(queue.dropped) > 0:
+        print(f"*** WARNING *** Packet queue overloaded:\n\tQueued: {len(queue)}\n\tDropped: {queue.dropped}")
+        queue.dropped.clear()
+    if len(queue.coalesced) > 0:
+        print(f"Stale telemetry replaced by newer readings: {queue.coalesced}")
+        queue.coalesced.clear()
+
+
 # Press the green button in the gutter to run the script.
 if __name__ == '__main__':
     main()
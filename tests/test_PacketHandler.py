@@ -0,0 +1,117 @@
+#  Copyright (C) 2023 Matteo Franceschini <matteof5730@gmail.com>
+#
+#  This file is part of SmartBase.
+#  SmartBase is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  SmartBase is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#  See the GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License along with SmartBase.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+from types import SimpleNamespace
+from uuid import uuid4
+
+from Data import THSensorDataPacket, PlantSensorDataPacket
+from Packet import Packet
+from PacketHandler import PacketHandlers
+from SmartApi import AssocState
+
+TH_PAYLOAD = THSensorDataPacket(21.5, 40.0, 21.0, 90).get_struct()
+PLANT_PAYLOAD = PlantSensorDataPacket(21.5, 40.0, 300.0, 90).get_struct()
+
+
+class StubNetwork:
+    def __init__(self):
+        self.buffer = []
+
+    def available(self) -> bool:
+        return len(self.buffer) > 0
+
+    def read(self):
+        return self.buffer.pop(0)
+
+    def receive(self, packet: Packet, from_node: int, payload=bytes()):
+        self.buffer.append((SimpleNamespace(type=packet.value, from_node=from_node), payload))
+
+
+class StubMesh:
+    def __init__(self):
+        self.addr_list = []
+
+    def get_node_id(self, address: int) -> int:
+        return address
+
+
+class StubApi:
+    def __init__(self):
+        self.calls = []
+
+    def get_assoc_state(self, device_id):
+        self.calls.append("get_assoc_state")
+        return AssocState.PENDING
+
+    def confirm_assoc(self, device_id):
+        self.calls.append("confirm_assoc")
+
+    def post_th_data(self, device_id, th_sensor_data):
+        self.calls.append("post_th_data")
+
+
+class StubDatabase:
+    def __init__(self):
+        self.uuid = uuid4()
+
+    def get_uuid(self, node_id: int):
+        return self.uuid
+
+
+class PacketHandlersTest(unittest.TestCase):
+    def setUp(self):
+        self.network = StubNetwork()
+        self.api = StubApi()
+        self.handlers = PacketHandlers(self.network, StubMesh(), self.api, StubDatabase(), packets_per_loop=4)
+
+    def test_drain_network_into_queue(self):
+        for node in range(1, 7):
+            self.network.receive(Packet.PING_PACKET, node)
+        self.handlers.handler()
+        self.assertFalse(self.network.available())
+        self.assertEqual(len(self.handlers.queue), 2)
+
+    def test_packets_per_loop_cap(self):
+        for node in range(1, 7):
+            self.network.receive(Packet.PING_PACKET, node)
+        self.handlers.handler()
+        self.assertEqual(len(self.handlers.queue), 2)
+        self.handlers.handler()
+        self.assertEqual(len(self.handlers.queue), 0)
+
+    def test_one_telemetry_upload_per_call(self):
+        self.network.receive(Packet.TH_SENSOR_DATA_PACKET, 1, TH_PAYLOAD)
+        self.network.receive(Packet.TH_SENSOR_DATA_PACKET, 2, TH_PAYLOAD)
+        self.handlers.handler()
+        self.assertEqual(self.api.calls, ["post_th_data"])
+        self.handlers.handler()
+        self.assertEqual(self.api.calls, ["post_th_data", "post_th_data"])
+
+    def test_control_before_telemetry_and_return_after_api_call(self):
+        self.network.receive(Packet.TH_SENSOR_DATA_PACKET, 1, TH_PAYLOAD)
+        self.network.receive(Packet.BTN_CONFIRM_PACKET, 2)
+        self.handlers.handler()
+        self.assertEqual(self.api.calls, ["get_assoc_state", "confirm_assoc"])
+        self.assertEqual(len(self.handlers.queue), 1)
+        self.handlers.handler()
+        self.assertEqual(self.api.calls[-1], "post_th_data")
+
+    def test_non_blocking_packets_do_not_end_call(self):
+        self.network.receive(Packet.PLANT_SENSOR_DATA_PACKET, 1, PLANT_PAYLOAD)
+        self.network.receive(Packet.TH_SENSOR_DATA_PACKET, 2, TH_PAYLOAD)
+        self.network.receive(Packet.PING_PACKET, 3)
+        self.handlers.handler()
+        self.assertEqual(self.api.calls, ["post_th_data"])
+        self.assertEqual(len(self.handlers.queue), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
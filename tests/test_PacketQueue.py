@@ -0,0 +1,118 @@
+#  Copyright (C) 2023 Matteo Franceschini <matteof5730@gmail.com>
+#
+#  This file is part of SmartBase.
+#  SmartBase is free software: you can redistribute it and/or modify it under the terms of the GNU Affero General Public License as published by the Free Software Foundation, either version 3 of the License, or (at your option) any later version.
+#
+#  SmartBase is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.
+#  See the GNU Affero General Public License for more details.
+#
+#  You should have received a copy of the GNU Affero General Public License along with SmartBase.  If not, see <https://www.gnu.org/licenses/>.
+
+import unittest
+from types import SimpleNamespace
+
+from Packet import Packet
+from PacketQueue import PacketQueue
+
+
+def header(packet: Packet, from_node: int):
+    return SimpleNamespace(type=packet.value, from_node=from_node)
+
+
+def pop_all(queue: PacketQueue) -> list[tuple[int, int]]:
+    popped = []
+    while (packet := queue.pop()) is not None:
+        popped.append((packet[0].type, packet[0].from_node))
+    return popped
+
+
+class PacketQueueTest(unittest.TestCase):
+    def test_reject_non_positive_size(self):
+        with self.assertRaises(ValueError):
+            PacketQueue(0)
+
+    def test_pop_empty(self):
+        self.assertIsNone(PacketQueue().pop())
+
+    def test_priority_order(self):
+        queue = PacketQueue()
+        queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 1), bytearray())
+        queue.push(header(Packet.ERROR_PACKET, 2), bytearray())
+        queue.push(header(Packet.BTN_CONFIRM_PACKET, 3), bytearray())
+        queue.push(header(Packet.PING_PACKET, 4), bytearray())
+        queue.push(header(Packet.NODE_ID_REQUEST_PACKET, 5), bytearray())
+        self.assertEqual(pop_all(queue), [
+            (Packet.BTN_CONFIRM_PACKET.value, 3),
+            (Packet.NODE_ID_REQUEST_PACKET.value, 5),
+            (Packet.ERROR_PACKET.value, 2),
+            (Packet.PING_PACKET.value, 4),
+            (Packet.TH_SENSOR_DATA_PACKET.value, 1),
+        ])
+
+    def test_info_stays_ahead_of_button_press(self):
+        queue = PacketQueue()
+        queue.push(header(Packet.INFO_PACKET, 5), bytearray())
+        queue.push(header(Packet.BTN_CONFIRM_PACKET, 5), bytearray())
+        self.assertEqual(pop_all(queue), [
+            (Packet.INFO_PACKET.value, 5),
+            (Packet.BTN_CONFIRM_PACKET.value, 5),
+        ])
+
+    def test_coalesce_per_node_and_type(self):
+        queue = PacketQueue()
+        queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 1), bytearray(b"old"))
+        queue.push(header(Packet.PLANT_SENSOR_DATA_PACKET, 1), bytearray(b"plant"))
+        queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 2), bytearray(b"other"))
+        self.assertTrue(queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 1), bytearray(b"new")))
+        self.assertEqual(len(queue), 3)
+        self.assertEqual(queue.coalesced, {Packet.TH_SENSOR_DATA_PACKET.value: 1})
+        self.assertEqual(queue.dropped, {})
+        # The newest payload keeps the slot of the packet it replaced
+        packet = queue.pop()
+        self.assertEqual((packet[0].type, packet[0].from_node), (Packet.TH_SENSOR_DATA_PACKET.value, 1))
+        self.assertEqual(packet[1], bytearray(b"new"))
+        self.assertEqual(pop_all(queue), [
+            (Packet.PLANT_SENSOR_DATA_PACKET.value, 1),
+            (Packet.TH_SENSOR_DATA_PACKET.value, 2),
+        ])
+
+    def test_shed_oldest_telemetry_when_full(self):
+        queue = PacketQueue(3)
+        queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 1), bytearray())
+        queue.push(header(Packet.ERROR_PACKET, 2), bytearray())
+        queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 3), bytearray())
+        self.assertTrue(queue.push(header(Packet.PING_PACKET, 4), bytearray()))
+        self.assertEqual(queue.dropped, {Packet.TH_SENSOR_DATA_PACKET.value: 1})
+        self.assertEqual(pop_all(queue), [
+            (Packet.ERROR_PACKET.value, 2),
+            (Packet.PING_PACKET.value, 4),
+            (Packet.TH_SENSOR_DATA_PACKET.value, 3),
+        ])
+
+    def test_shed_normal_for_control_when_no_telemetry(self):
+        queue = PacketQueue(2)
+        queue.push(header(Packet.ERROR_PACKET, 1), bytearray())
+        queue.push(header(Packet.PING_PACKET, 2), bytearray())
+        self.assertTrue(queue.push(header(Packet.BTN_RESET_PACKET, 3), bytearray()))
+        self.assertEqual(queue.dropped, {Packet.ERROR_PACKET.value: 1})
+        self.assertEqual(pop_all(queue), [
+            (Packet.BTN_RESET_PACKET.value, 3),
+            (Packet.PING_PACKET.value, 2),
+        ])
+
+    def test_reject_when_nothing_to_shed(self):
+        queue = PacketQueue(1)
+        queue.push(header(Packet.BTN_CONFIRM_PACKET, 1), bytearray())
+        self.assertFalse(queue.push(header(Packet.ERROR_PACKET, 2), bytearray()))
+        self.assertFalse(queue.push(header(Packet.TH_SENSOR_DATA_PACKET, 3), bytearray()))
+        self.assertFalse(queue.push(header(Packet.BTN_RESET_PACKET, 4), bytearray()))
+        self.assertEqual(queue.dropped, {
+            Packet.ERROR_PACKET.value: 1,
+            Packet.TH_SENSOR_DATA_PACKET.value: 1,
+            Packet.BTN_RESET_PACKET.value: 1,
+        })
+        self.assertEqual(pop_all(queue), [(Packet.BTN_CONFIRM_PACKET.value, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()